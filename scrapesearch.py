@@ -3,17 +3,40 @@
 # It supports parallel scraping, configurable settings, and multiple output formats.
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+from urllib3.util import Retry, make_headers
 from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+import soupsieve
+import lxml.etree
+import lxml.html
 import random
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from tqdm import tqdm
 import time
 import csv
 import os
 import sys
 import re
+import dataclasses
+from dataclasses import dataclass
+import functools
+import hashlib
+import itertools
+import multiprocessing
+import signal
+import socket
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
 
 # --- Configuration and Settings ---
 # A list of domains to skip during scraping.
@@ -21,7 +44,10 @@ DOMAINS_TO_SKIP = [
     "twitter.com"
 ]
 
-# A list of User-Agent strings to randomly choose from.
+# The same domains as a set, for fast lookups of a URL's host and its parent domains.
+_SKIPPED_DOMAINS = frozenset(domain.lower() for domain in DOMAINS_TO_SKIP)
+
+# A list of User-Agent strings to rotate through.
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36",
@@ -32,6 +58,20 @@ USER_AGENTS = [
     "Mozilla/5.0 (iPad; CPU OS 16_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.1 Mobile/15E148 Safari/604.1"
 ]
 
+# User-Agents are shuffled once and then rotated, which avoids contending for the
+# global random module lock from every worker thread on every request.
+_USER_AGENT_CYCLE = itertools.cycle(random.sample(USER_AGENTS, len(USER_AGENTS)))
+
+# Pages larger than this (in bytes) are truncated rather than downloaded in full.
+MAX_PAGE_BYTES = 2_000_000
+
+# At most this many pages are downloaded from the same host at once (retries
+# included), so a slow or rate-limiting site can't occupy every worker.
+MAX_REQUESTS_PER_HOST = 2
+
+# Content types that are scraped; anything else is skipped without downloading the body.
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
 DEFAULT_CONFIG = {
     "num_urls": 5,
     "timeout": 10,
@@ -39,7 +79,9 @@ DEFAULT_CONFIG = {
     "retries": 3,
     "output_format": "json",
     "output_fields": ["url", "title", "description", "full_content"],
-    "search_engine": "google"
+    "search_engine": "google",
+    "cache_dir": ".scrapesearch_cache",
+    "cache_ttl": 3600
 }
 
 SEARCH_ENGINES = {
@@ -72,28 +114,182 @@ SEARCH_ENGINES = {
     }
 }
 
+# Patterns used by sanitize_filename and clean_text.
+_INVALID_FILENAME_CHARS = re.compile(r'[^\w\s-]')
+_WHITESPACE = re.compile(r'\s+')
+
+@dataclass(frozen=True)
+class EngineSelectors:
+    """Precompiled CSS selectors for one search engine's result page."""
+    result_link_container: soupsieve.SoupSieve
+    link: soupsieve.SoupSieve
+    title: soupsieve.SoupSieve
+    snippet_container: soupsieve.SoupSieve
+
+@dataclass(slots=True)
+class ScrapedPage:
+    """The information scraped from a single page."""
+    url: str
+    title: str
+    description: str
+    full_content: str
+
+# Names of the fields a ScrapedPage has, for checking requested output fields.
+_PAGE_FIELDS = frozenset(field.name for field in dataclasses.fields(ScrapedPage))
+
+# Search result selectors compiled once per engine, so the CSS strings above are
+# not re-parsed on every query.
+_COMPILED_SELECTORS = {
+    engine: EngineSelectors(**{name: soupsieve.compile(selector)
+                               for name, selector in engine_config["selectors"].items()})
+    for engine, engine_config in SEARCH_ENGINES.items()
+}
+
+# Tags whose text makes up a page's content, and tags whose whole subtree is
+# ignored when extracting it.
+_CONTENT_TAGS = frozenset(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])
+_SKIPPED_TAGS = frozenset(['header', 'footer', 'nav', 'aside', 'script', 'style'])
+
+@functools.lru_cache(maxsize=32)
+def _html_parser(encoding):
+    """
+    Returns a shared HTML parser that decodes pages with the given encoding.
+    Comments are dropped while parsing so that the text around them is merged into
+    the surrounding elements, where extract_content_text can see it.
+    """
+    try:
+        return lxml.html.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+    except LookupError:
+        # An encoding libxml2 doesn't know; let it detect one itself.
+        return lxml.html.HTMLParser(remove_comments=True, remove_pis=True)
+
+# --- DNS Cache ---
+# Search results often point at the same few hosts, so resolve each host once
+# and reuse the answer for a while. socket.getaddrinfo is patched so that every
+# lookup made by requests/urllib3 goes through the cache.
+DNS_CACHE_TTL = 300
+DNS_CACHE_SIZE = 512
+
+_dns_cache = OrderedDict()
+_dns_lock = threading.Lock()
+_orig_getaddrinfo = socket.getaddrinfo
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """Drop-in replacement for socket.getaddrinfo with a TTL'd LRU cache."""
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            _dns_cache.move_to_end(key)
+            return entry[1]
+
+    result = _orig_getaddrinfo(host, port, family, type, proto, flags)
+
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+        _dns_cache.move_to_end(key)
+        while len(_dns_cache) > DNS_CACHE_SIZE:
+            _dns_cache.popitem(last=False)
+    return result
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+# --- HTTP Session ---
+# A single shared session so that connections (TCP + TLS) are kept alive and
+# reused across requests. urllib3's connection pools are thread-safe, so the
+# worker threads can all share it.
+SESSION = requests.Session()
+# Advertise every encoding urllib3 can decode here: gzip and deflate always,
+# plus brotli (and zstd) when the optional packages are installed.
+SESSION.headers.update({
+    "Connection": "keep-alive",
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"]
+})
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def host_semaphore(url):
+    """Returns the semaphore that limits concurrent requests to the URL's host."""
+    host = urlsplit(url).hostname or ''
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = _host_semaphores[host] = threading.Semaphore(MAX_REQUESTS_PER_HOST)
+    return semaphore
+
+def configure_session(retries):
+    """
+    Mounts the session's connection pools and sets up retries with exponential
+    backoff for failed GET requests.
+    """
+    retry = Retry(total=retries,
+                  backoff_factor=0.5,
+                  status_forcelist=(500, 502, 503, 504),
+                  respect_retry_after_header=True,
+                  allowed_methods=frozenset(['GET']))
+    # Keep idle connections for up to 64 hosts so keep-alive carries across the
+    # queries of a batch. Pages are never fetched more than MAX_REQUESTS_PER_HOST
+    # at a time from one host, so that's all the connections a host pool needs.
+    adapter = HTTPAdapter(pool_connections=64,
+                          pool_maxsize=MAX_REQUESTS_PER_HOST,
+                          max_retries=retry)
+    SESSION.mount("https://", adapter)
+    SESSION.mount("http://", adapter)
+
+configure_session(DEFAULT_CONFIG["retries"])
+
+@functools.lru_cache(maxsize=4)
+def _read_config_file(filename):
+    """Reads and parses a JSON config file. Cached, so each file is only read once."""
+    with open(filename, 'rb') as f:
+        content = f.read()
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
 def load_config(filename="config.json"):
-    """Loads configuration from a JSON file."""
-    if os.path.exists(filename):
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"Error reading config file: {e}. Using default settings.")
-            return DEFAULT_CONFIG
-    return DEFAULT_CONFIG
+    """Loads configuration from a JSON file. Settings missing from the file fall back to DEFAULT_CONFIG."""
+    try:
+        # A new dict every time, as callers override settings in place.
+        return {**DEFAULT_CONFIG, **_read_config_file(filename)}
+    except FileNotFoundError:
+        return dict(DEFAULT_CONFIG)
+    except json.JSONDecodeError as e:
+        print(f"Error reading config file: {e}. Using default settings.")
+        return dict(DEFAULT_CONFIG)
 
 # --- Core Functions ---
 def clean_text(text):
     """Cleans up text by removing extra whitespace and newlines."""
     if not isinstance(text, str):
         return ""
-    text = ' '.join(text.split())
-    return text.strip()
+    return _WHITESPACE.sub(' ', text).strip()
 
-def fetch_search_results(query, search_engine, timeout_seconds, retries):
+def iter_search_results(soup, selectors):
     """
-    Fetches search results from a specified search engine with retries.
+    Yields (url, title, snippet) tuples for the results on a search results page.
+    Text is left uncleaned; only the results that end up being used are cleaned.
+    """
+    link_sel, title_sel, snippet_sel = selectors.link, selectors.title, selectors.snippet_container
+    for link_container in selectors.result_link_container.select(soup):
+        link = link_sel.select_one(link_container)
+        link_href = link.get('href') if link else None
+        if not link_href:
+            continue
+        title_elem = title_sel.select_one(link_container)
+        title_text = title_elem.text if title_elem else "No title found"
+        # Results whose title element is present but empty are skipped.
+        if not title_text:
+            continue
+        snippet_elem = snippet_sel.select_one(link_container)
+        yield (link_href,
+               title_text,
+               snippet_elem.text if snippet_elem else "No snippet found")
+
+def fetch_search_results(query, search_engine, timeout_seconds):
+    """
+    Fetches search results from a specified search engine.
+    Returns a list of (url, title, snippet) tuples.
     """
     if search_engine not in SEARCH_ENGINES:
         print(f"Error: Unsupported search engine '{search_engine}'. Using 'google' instead.")
@@ -101,123 +297,249 @@ def fetch_search_results(query, search_engine, timeout_seconds, retries):
     
     engine_config = SEARCH_ENGINES[search_engine]
     search_url = f"{engine_config['url']}{query}"
-    selectors = engine_config['selectors']
+    selectors = _COMPILED_SELECTORS[search_engine]
 
-    for attempt in range(retries):
-        headers = {"User-Agent": random.choice(USER_AGENTS)}
-        try:
-            response = requests.get(search_url, headers=headers, allow_redirects=True, timeout=timeout_seconds)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            result_links = soup.select(selectors['result_link_container'])
-            
-            results = []
-            if result_links:
-                for link_container in result_links:
-                    link = link_container.select_one(selectors['link'])
-                    title_elem = link_container.select_one(selectors['title'])
-                    snippet_elem = link_container.select_one(selectors['snippet_container'])
-                    
-                    link_href = link.get('href') if link else None
-                    title_text = title_elem.text if title_elem else "No title found"
-                    snippet_text = snippet_elem.text if snippet_elem else "No snippet found"
-                    
-                    if link_href and title_text:
-                        results.append({
-                            "url": link_href,
-                            "title": clean_text(title_text),
-                            "snippet": clean_text(snippet_text)
-                        })
-                return results
-            else:
-                print(f"No main search results found for {search_engine}.")
-                return []
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code in [500, 503]:
-                print(f"Server error ({e.response.status_code}) on attempt {attempt + 1}. Retrying...")
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                print(f"An HTTP error occurred: {e}")
-                return []
-        except requests.exceptions.Timeout:
-            print(f"Timeout occurred on attempt {attempt + 1}. Retrying...")
-            time.sleep(2 ** attempt)
-        except requests.exceptions.RequestException as e:
-            print(f"An error occurred while fetching search results: {e}")
-            return []
+    # Server errors and timeouts are retried by the session's adapter.
+    headers = {"User-Agent": next(_USER_AGENT_CYCLE)}
+    try:
+        response = SESSION.get(search_url, headers=headers, allow_redirects=True, timeout=timeout_seconds)
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        print(f"An HTTP error occurred: {e}")
+        return []
+    except requests.exceptions.RetryError as e:
+        print(f"Failed to fetch search results after retrying: {e}")
+        return []
+    except requests.exceptions.RequestException as e:
+        print(f"An error occurred while fetching search results: {e}")
+        return []
     
-    print(f"Failed to fetch search results after {retries} attempts.")
-    return []
+    soup = BeautifulSoup(response.content, 'lxml')
+    results = list(iter_search_results(soup, selectors))
+    if not results:
+        print(f"No main search results found for {search_engine}.")
+    return results
 
-def scrape_page(url, verbose, timeout_seconds, retries):
+def skipped_domain(url):
+    """Returns the entry in DOMAINS_TO_SKIP that the URL's host is, or is a subdomain of, or None."""
+    labels = (urlsplit(url).hostname or '').split('.')
+    for i in range(len(labels)):
+        domain = '.'.join(labels[i:])
+        if domain in _SKIPPED_DOMAINS:
+            return domain
+    return None
+
+def fetch_page(url, verbose, timeout_seconds, cache_dir=None, cache_ttl=0):
     """
-    Scrapes information from a given URL with retries.
+    Downloads the raw HTML of a given URL. Retries are handled by the session.
+    This is the network stage of scraping; the returned (content, charset) pair
+    is handed to parse_page. charset is None if the server didn't declare one.
+    Pages downloaded less than cache_ttl seconds ago are served from cache_dir.
     """
-    for domain in DOMAINS_TO_SKIP:
-        if domain in url:
-            if verbose:
-                print(f"\nSkipping {domain} page: {url}")
-            return None
+    domain = skipped_domain(url)
+    if domain:
+        if verbose:
+            print(f"\nSkipping {domain} page: {url}")
+        return None
     
-    for attempt in range(retries):
-        try:
+    if cache_dir and cache_ttl > 0:
+        page = read_cached_page(url, cache_dir, cache_ttl)
+        if page is not None:
             if verbose:
-                print(f"\nScraping page: {url} (Attempt {attempt + 1})")
-                
-            headers = {"User-Agent": random.choice(USER_AGENTS)}
-            response = requests.get(url, headers=headers, timeout=timeout_seconds)
-            response.raise_for_status()
+                print(f"\nUsing cached page: {url}")
+            return page
+    
+    try:
+        if verbose:
+            print(f"\nScraping page: {url}")
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+        headers = {"User-Agent": next(_USER_AGENT_CYCLE)}
+        with SESSION.get(url, headers=headers, timeout=timeout_seconds, stream=True) as response:
+            response.raise_for_status()
             
-            page_title = soup.title.get_text(strip=True) if soup.title else "No title found"
-            meta_description = soup.find("meta", attrs={"name": "description"})
-            page_description = meta_description["content"] if meta_description else "No description found"
+            # Only HTML is worth downloading; skip PDFs, images and other binaries.
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.lower().startswith(HTML_CONTENT_TYPES):
+                if verbose:
+                    print(f"\nSkipping non-HTML page ({content_type or 'unknown type'}): {url}")
+                return None
             
-            # More intelligent content extraction
-            # Find the main content area and exclude common non-content elements
-            main_content_tags = soup.find('main') or soup.find('article') or soup.body
+            # Read the body in chunks and stop at MAX_PAGE_BYTES so huge pages
+            # don't tie up a worker or blow up memory.
+            chunks = []
+            total = 0
+            for chunk in response.iter_content(chunk_size=65536):
+                total += len(chunk)
+                if total > MAX_PAGE_BYTES:
+                    break
+                chunks.append(chunk)
+            content = b"".join(chunks)
             
-            if main_content_tags:
-                # Remove common irrelevant tags before extracting text
-                for tag in main_content_tags.find_all(['header', 'footer', 'nav', 'aside', 'script', 'style']):
-                    tag.decompose()
-                
-                content_tags = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']
-                page_contents = " ".join([tag.get_text(strip=True) for tag in main_content_tags.find_all(content_tags)])
-            else:
-                page_contents = "No content found in main tags."
+            # Only trust an explicit charset; requests assumes ISO-8859-1 for any
+            # text/* response without one.
+            charset = get_encoding_from_headers(response.headers) if 'charset=' in content_type.lower() else None
+        
+        if cache_dir and cache_ttl > 0:
+            write_cached_page(url, content, charset, cache_dir)
+        return content, charset
+    except requests.exceptions.RequestException as e:
+        if verbose:
+            print(f"Failed to scrape {url}: {e}")
+        return None
+    except Exception as e:
+        if verbose:
+            print(f"An unexpected error occurred while scraping {url}: {e}")
+        return None
 
-            if verbose:
-                print(f"Page title: {clean_text(page_title)}")
-                print(f"Page description: {clean_text(page_description)}")
-                print(f"Page content snippet: {clean_text(page_contents)[:200]}...")
-                
-            return {
-                "url": url,
-                "title": clean_text(page_title),
-                "description": clean_text(page_description),
-                "full_content": clean_text(page_contents)
-            }
-        except requests.exceptions.RequestException as e:
-            if verbose:
-                print(f"Error while scraping {url}: {e} on attempt {attempt + 1}")
-            time.sleep(2 ** attempt)
-        except Exception as e:
-            if verbose:
-                print(f"An unexpected error occurred while scraping {url}: {e}")
+def _cache_path(url, cache_dir):
+    """Returns the cache file path for a URL, named after a hash of the URL."""
+    key = hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"{key}.page")
+
+def read_cached_page(url, cache_dir, ttl):
+    """
+    Returns the cached (content, charset) pair for a URL if it is younger than ttl
+    seconds, otherwise None.
+    """
+    path = _cache_path(url, cache_dir)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
             return None
-    
-    if verbose:
-        print(f"Failed to scrape {url} after {retries} attempts.")
-    return None
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The first line holds the charset the server declared (empty if none).
+    charset, _, content = data.partition(b'\n')
+    try:
+        charset = charset.decode('ascii')
+    except UnicodeDecodeError:
+        # Not a file written by write_cached_page; treat it as a cache miss.
+        return None
+    return content, charset or None
+
+def write_cached_page(url, content, charset, cache_dir):
+    """Stores a page's HTML and charset in the cache. Failures are ignored, as the cache is only an optimization."""
+    path = _cache_path(url, cache_dir)
+    # Write to a temporary file first so a concurrent reader never sees a partial page.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write((charset or '').encode('ascii', 'ignore') + b'\n')
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def prune_page_cache(cache_dir, ttl):
+    """Deletes cached pages (and leftover temporary files) older than ttl seconds."""
+    cutoff = time.time() - ttl
+    try:
+        entries = list(os.scandir(cache_dir))
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.name.endswith(('.page', '.tmp')):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def extract_content_text(root):
+    """
+    Collects the text inside content tags (paragraphs, headings, list items)
+    under root, ignoring common irrelevant tags such as navigation and scripts.
+    Done in a single walk over the tree rather than removing tags first.
+    """
+    parts = []
+    skip_depth = 0
+    content_depth = 0
+    for event, element in lxml.etree.iterwalk(root, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if skip_depth or tag in _SKIPPED_TAGS:
+                skip_depth += 1
+                continue
+            if tag in _CONTENT_TAGS:
+                content_depth += 1
+            if content_depth and element.text:
+                parts.append(element.text)
+        else:
+            if skip_depth:
+                skip_depth -= 1
+                if skip_depth:
+                    continue
+            elif tag in _CONTENT_TAGS:
+                content_depth -= 1
+            # An element's tail text belongs to its parent.
+            if content_depth and element.tail:
+                parts.append(element.tail)
+    return " ".join(parts)
+
+def parse_page(url, content, charset, verbose):
+    """
+    Extracts the title, description and main text from a page's raw HTML.
+    This is the CPU stage of scraping and runs in a separate process.
+    """
+    try:
+        if not charset:
+            # Detect the encoding the way BeautifulSoup does (declared <meta> charset,
+            # then UTF-8, then Windows-1252) instead of letting libxml2 assume Latin-1.
+            charset = UnicodeDammit(content, is_html=True).original_encoding
+        tree = lxml.html.document_fromstring(content, parser=_html_parser(charset))
+        
+        page_title = tree.findtext('.//title')
+        if page_title is None:
+            page_title = "No title found"
+        meta_description = tree.xpath('//meta[@name="description"]/@content')
+        page_description = meta_description[0] if meta_description else "No description found"
+        
+        # More intelligent content extraction
+        # Find the main content area and exclude common non-content elements
+        main_content_tags = tree.find('.//main')
+        if main_content_tags is None:
+            main_content_tags = tree.find('.//article')
+        if main_content_tags is None:
+            main_content_tags = tree.find('body')
+        
+        if main_content_tags is not None:
+            page_contents = extract_content_text(main_content_tags)
+        else:
+            page_contents = "No content found in main tags."
+
+        if verbose:
+            print(f"Page title: {clean_text(page_title)}")
+            print(f"Page description: {clean_text(page_description)}")
+            print(f"Page content snippet: {clean_text(page_contents)[:200]}...")
+            
+        return ScrapedPage(
+            url=url,
+            title=clean_text(page_title),
+            description=clean_text(page_description),
+            full_content=clean_text(page_contents)
+        )
+    except Exception as e:
+        if verbose:
+            print(f"An unexpected error occurred while parsing {url}: {e}")
+        return None
+
+def to_json_bytes(data, indent=False):
+    """Serializes data to UTF-8 encoded JSON, using the much faster orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, indent=4 if indent else None).encode('utf-8')
 
 def save_to_json(data, filename):
     """Saves a list of dictionaries to a JSON file."""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        with open(filename, 'wb') as f:
+            f.write(to_json_bytes(data, indent=True))
         print(f"\nSuccessfully saved scraped data to {filename}")
     except Exception as e:
         print(f"An error occurred while saving the JSON file: {e}")
@@ -237,123 +559,241 @@ def save_to_csv(data, filename, fields):
     except Exception as e:
         print(f"An error occurred while saving the CSV file: {e}")
 
+class ParsePool:
+    """
+    A process pool for parsing pages that replaces itself when a worker process
+    dies. A plain ProcessPoolExecutor stays broken after a crash and would fail
+    every page submitted afterwards.
+    """
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = self._new_executor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._executor.shutdown()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers,
+                                   # Workers start only once download threads are running; forking
+                                   # then could copy a lock another thread holds, so spawn them fresh.
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   # Leave Ctrl-C to the main process, so workers exit quietly with it.
+                                   initializer=signal.signal,
+                                   initargs=(signal.SIGINT, signal.SIG_IGN))
+
+    def submit(self, fn, *args):
+        """Schedules fn(*args) on a worker, starting a fresh pool if the current one is broken."""
+        try:
+            return self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            print("\nA parse worker crashed; restarting the parse pool.")
+            self._executor.shutdown(wait=False)
+            self._executor = self._new_executor()
+            return self._executor.submit(fn, *args)
+
+class ResultWriter:
+    """
+    Streams scraped items to a JSON or CSV file as they are produced, so large
+    batches never have to be held in memory. The file is only created once the
+    first item is written.
+    """
+    def __init__(self, filename, output_format, fields):
+        self.filename = filename
+        self.output_format = output_format
+        self.fields = fields
+        self.count = 0
+        self._file = None
+        self._csv_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open(self):
+        if self.output_format == 'json':
+            self._file = open(self.filename, 'wb')
+        else:
+            self._file = open(self.filename, 'w', encoding='utf-8', newline='')
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=self.fields)
+            self._csv_writer.writeheader()
+
+    def write(self, items):
+        """Appends a list of dictionaries to the output file."""
+        for item in items:
+            if self._file is None:
+                self._open()
+            if self.output_format == 'json':
+                # One compact object per line; the list brackets are written around them.
+                self._file.write(b'[\n' if self.count == 0 else b',\n')
+                self._file.write(to_json_bytes(item))
+            else:
+                self._csv_writer.writerow(item)
+            self.count += 1
+
+    def close(self):
+        """Finishes and closes the output file, if anything was written."""
+        if self._file is None:
+            return
+        if self.output_format == 'json':
+            self._file.write(b'\n]\n')
+        self._file.close()
+        self._file = None
+        print(f"\nSuccessfully saved scraped data to {self.filename}")
+
+@functools.lru_cache(maxsize=1024)
 def sanitize_filename(query):
     """Creates a safe filename from a query string by replacing invalid characters with underscores."""
     # Replaces any sequence of characters that are not alphanumeric, spaces, or hyphens with a single underscore.
-    safe_name = re.sub(r'[^\w\s-]', '_', query).strip()
+    safe_name = _INVALID_FILENAME_CHARS.sub('_', query).strip()
     # Replaces any remaining spaces with underscores.
-    safe_name = re.sub(r'\s+', '_', safe_name)
-    return safe_name
+    return _WHITESPACE.sub('_', safe_name)
 
 # --- Main Execution Modes ---
 def process_scraped_data(scraped_data, fields):
     """
-    Filters scraped data to include only the specified fields and performs validation.
+    Converts scraped pages into dictionaries holding only the specified fields and performs validation.
     An item is only considered invalid if the 'url' field is missing.
     """
     processed_data = []
     for item in scraped_data:
         # We only filter out items if the URL is missing, as other fields
         # might be legitimately empty but the data is still useful.
-        if item.get('url'):
-            filtered_item = {field: item.get(field) for field in fields if field in item}
-            # Fill in missing fields with a placeholder to maintain structure
-            for field in fields:
-                if field not in filtered_item:
-                    filtered_item[field] = "Field not found"
-            processed_data.append(filtered_item)
+        if item.url:
+            # Unknown fields get a placeholder to maintain structure
+            processed_data.append({field: getattr(item, field) if field in _PAGE_FIELDS else "Field not found"
+                                   for field in fields})
     return processed_data
 
-def process_single_query(query, args, config):
-    """Processes a single search query and its scraping tasks."""
+def process_single_query(query, args, config, executor, parse_executor):
+    """
+    Processes a single search query. Pages are downloaded on the shared thread
+    pool and parsed on the process pool as soon as each download finishes.
+    A URL is only handed to the thread pool once its host has a free slot, so
+    URLs waiting on a busy host never hold up downloads from other hosts.
+    """
     print(f"Processing query: '{query}'")
     # The search engine is determined by the config, which can be overridden by the CLI arg
     search_engine = args.engine if args.engine else config.get('search_engine', 'google')
-    results = fetch_search_results(query, search_engine, config["timeout"], config["retries"])
+    results = fetch_search_results(query, search_engine, config["timeout"])
     
     if args.search_only:
         print("\nSearch results (not scraping):")
-        for i, result in enumerate(results[:config["num_urls"]]):
-            print(f"{i+1}. {result['title']} - {result['url']}")
+        for i, (url, title, _) in enumerate(results[:config["num_urls"]]):
+            print(f"{i+1}. {clean_text(title)} - {url}")
         return []
     
     scraped_data = []
     if results:
-        urls_to_scrape = random.sample(results, min(config["num_urls"], len(results)))
+        urls_to_scrape = [url for url, _, _ in random.sample(results, min(config["num_urls"], len(results)))]
+        waiting = deque(urls_to_scrape)
+        future_to_url = {}
+
+        def submit_ready_urls():
+            """Submits every waiting URL whose host has a free slot; the rest keep waiting."""
+            for _ in range(len(waiting)):
+                url = waiting.popleft()
+                if host_semaphore(url).acquire(blocking=False):
+                    future = executor.submit(fetch_page, url, args.verbose, config["timeout"],
+                                             config["cache_dir"], config["cache_ttl"])
+                    future_to_url[future] = url
+                else:
+                    waiting.append(url)
+
+        # Parsing a finished page overlaps with the downloads still in flight.
+        parse_future_to_url = {}
+        with tqdm(total=len(urls_to_scrape), desc=f"Scraping '{query}'") as progress:
+            submit_ready_urls()
+            while future_to_url:
+                done, _ = wait(future_to_url, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = future_to_url.pop(future)
+                    host_semaphore(url).release()
+                    progress.update()
+                    page = future.result()
+                    if page:
+                        content, charset = page
+                        parse_future = parse_executor.submit(parse_page, url, content, charset, args.verbose)
+                        parse_future_to_url[parse_future] = url
+                # Finished downloads free up host slots for waiting URLs.
+                submit_ready_urls()
         
-        with ThreadPoolExecutor(max_workers=config["max_workers"]) as executor:
-            future_to_url = {executor.submit(scrape_page, url['url'], args.verbose, config["timeout"], config["retries"]): url['url'] for url in urls_to_scrape}
-            
-            for future in tqdm(as_completed(future_to_url), total=len(urls_to_scrape), desc=f"Scraping '{query}'"):
+        for future in as_completed(parse_future_to_url):
+            # parse_page handles its own errors, but a crashed worker process
+            # surfaces here; its page is lost, and the pool restarts on the next submit.
+            try:
                 scraped_result = future.result()
-                if scraped_result:
-                    scraped_data.append(scraped_result)
+            except BrokenProcessPool:
+                print(f"\nCould not parse {parse_future_to_url[future]}: a parse worker crashed.")
+                continue
+            if scraped_result:
+                scraped_data.append(scraped_result)
     
     return scraped_data
 
-def cli_mode(args, config):
+def cli_mode(args, config, executor, parse_executor):
     """Handles the command-line interface mode of the script."""
-    all_scraped_data = []
+    # Use the provided output file name, but ensure the correct extension.
+    # This logic is simpler and more readable.
+    if args.output_file:
+        base, ext = os.path.splitext(args.output_file)
+        filename = f"{base}.{config['output_format']}"
+    else:
+        filename = f"scraped_results.{config['output_format']}"
 
-    if args.input_file:
-        try:
-            with open(args.input_file, 'r', encoding='utf-8') as f:
-                queries = [line.strip() for line in f if line.strip()]
-            
-            if not queries:
-                print("Input file is empty. Exiting.")
-                return
+    # Combined results are streamed to disk query by query rather than
+    # collected in memory until the whole batch is done.
+    with ResultWriter(filename, config['output_format'], config['output_fields']) as writer:
+        if args.input_file:
+            try:
+                with open(args.input_file, 'r', encoding='utf-8') as f:
+                    queries = [line.strip() for line in f if line.strip()]
+                
+                if not queries:
+                    print("Input file is empty. Exiting.")
+                    return
 
-            print(f"Found {len(queries)} queries in '{args.input_file}'.")
-            
-            for query in queries:
-                scraped_results = process_single_query(query, args, config)
-                processed_data = process_scraped_data(scraped_results, config["output_fields"])
+                print(f"Found {len(queries)} queries in '{args.input_file}'.")
                 
-                if processed_data:
-                    if args.per_query_output:
-                        filename = f"{sanitize_filename(query)}.{config['output_format']}"
-                        if config['output_format'] == 'json':
-                            save_to_json(processed_data, filename)
-                        elif config['output_format'] == 'csv':
-                            save_to_csv(processed_data, filename, config['output_fields'])
-                    else:
-                        all_scraped_data.extend(processed_data)
+                for query in queries:
+                    scraped_results = process_single_query(query, args, config, executor, parse_executor)
+                    processed_data = process_scraped_data(scraped_results, config["output_fields"])
+                    
+                    if processed_data:
+                        if args.per_query_output:
+                            filename = f"{sanitize_filename(query)}.{config['output_format']}"
+                            if config['output_format'] == 'json':
+                                save_to_json(processed_data, filename)
+                            elif config['output_format'] == 'csv':
+                                save_to_csv(processed_data, filename, config['output_fields'])
+                        else:
+                            writer.write(processed_data)
+                    
+                    print("-" * 50)
                 
-                print("-" * 50)
-            
-        except FileNotFoundError:
-            print(f"Error: The file '{args.input_file}' was not found.")
-            return
-        except Exception as e:
-            print(f"An error occurred while reading the input file: {e}")
+            except FileNotFoundError:
+                print(f"Error: The file '{args.input_file}' was not found.")
+                return
+            except Exception as e:
+                print(f"An error occurred while reading the input file: {e}")
+                return
+        elif args.query:
+            scraped_results = process_single_query(args.query, args, config, executor, parse_executor)
+            writer.write(process_scraped_data(scraped_results, config["output_fields"]))
+        else:
+            print("Please provide a search query or an input file.")
             return
-    elif args.query:
-        scraped_results = process_single_query(args.query, args, config)
-        all_scraped_data.extend(process_scraped_data(scraped_results, config["output_fields"]))
-    else:
-        print("Please provide a search query or an input file.")
-        return
     
-    if all_scraped_data:
-        # Use the provided output file name, but ensure the correct extension.
-        # This logic is simpler and more readable.
-        if args.output_file:
-            base, ext = os.path.splitext(args.output_file)
-            filename = f"{base}.{config['output_format']}"
-        else:
-            filename = f"scraped_results.{config['output_format']}"
-
-        if config['output_format'] == 'json':
-            save_to_json(all_scraped_data, filename)
-        elif config['output_format'] == 'csv':
-            save_to_csv(all_scraped_data, filename, config['output_fields'])
-        
-        print(f"\nSummary: Successfully scraped a total of {len(all_scraped_data)} pages.")
-    elif not args.per_query_output and not all_scraped_data:
+    if writer.count:
+        print(f"\nSummary: Successfully scraped a total of {writer.count} pages.")
+    elif not args.per_query_output:
         print("\nNo data was successfully scraped.")
 
-def interactive_mode(args, config):
+def interactive_mode(args, config, executor, parse_executor):
     """Handles the interactive mode of the script."""
     while True:
         try:
@@ -361,7 +801,7 @@ def interactive_mode(args, config):
             if query.lower() == "quit":
                 break
             
-            scraped_data = process_single_query(query, args, config)
+            scraped_data = process_single_query(query, args, config, executor, parse_executor)
             
             if scraped_data:
                 processed_data = process_scraped_data(scraped_data, config["output_fields"])
@@ -426,6 +866,8 @@ def main():
                                    help="Timeout for each HTTP request in seconds.")
     performance_group.add_argument("-w", "--max-workers", type=int,
                                    help="Maximum number of concurrent workers for scraping.")
+    performance_group.add_argument("-c", "--cache-ttl", type=int,
+                                   help="Seconds to reuse cached pages from previous runs (0 disables the cache).")
 
     # Argument for search-only mode
     parser.add_argument("-s", "--search-only", action="store_true",
@@ -441,6 +883,8 @@ def main():
         config["timeout"] = args.timeout
     if args.max_workers is not None:
         config["max_workers"] = args.max_workers
+    if args.cache_ttl is not None:
+        config["cache_ttl"] = args.cache_ttl
     if args.format is not None:
         config["output_format"] = args.format
     if args.fields is not None:
@@ -448,15 +892,27 @@ def main():
     if args.engine is not None:
         config["search_engine"] = args.engine
 
+    configure_session(config["retries"])
+
+    # Expired pages are never read again, so clear them out rather than letting the cache grow forever.
+    if config["cache_dir"] and config["cache_ttl"] > 0:
+        prune_page_cache(config["cache_dir"], config["cache_ttl"])
+
     # Check for mutually exclusive arguments
     if args.query and args.input_file:
         parser.error("Arguments 'query' and '-i/--input-file' are mutually exclusive. Please use one or the other.")
 
     try:
-        if args.query or args.input_file:
-            cli_mode(args, config)
-        else:
-            interactive_mode(args, config)
+        # One worker pool for the whole run, so threads (and the session's pooled
+        # connections) are reused across every query instead of per query.
+        # HTML parsing is CPU-bound, so it gets its own process pool to stay
+        # clear of the GIL while the threads keep downloading.
+        with ThreadPoolExecutor(max_workers=config["max_workers"]) as executor, \
+                ParsePool(max_workers=min(os.cpu_count() or 1, config["max_workers"])) as parse_executor:
+            if args.query or args.input_file:
+                cli_mode(args, config, executor, parse_executor)
+            else:
+                interactive_mode(args, config, executor, parse_executor)
     except KeyboardInterrupt:
         print("\n\nScript interrupted. Exiting gracefully.")
         sys.exit(0)